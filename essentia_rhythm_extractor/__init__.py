@@ -1,22 +1,49 @@
 # Import the compiled extension
-from _rhythmext import (  # type: ignore
-    onset_detection,
-    rhythm_extractor_2013,
-    rhythm_multifeature,
-)
+from _rhythmext import onset_detection as _onset_detection  # type: ignore
+from _rhythmext import rhythm_extractor_2013 as _rhythm_extractor_2013  # type: ignore
+from _rhythmext import rhythm_multifeature as _rhythm_multifeature  # type: ignore
 
 """This module provides Python bindings for rhythm feature extraction
 using the Essentia library's BeatTrackerMultiFeature and RhythmExtractor2013 algorithms.
-The core functionality is implemented in C++ and exposed to Python via pybind11.
+The core functionality is implemented in C++ and exposed to Python via nanobind.
 """
 
 
+# The nanobind array arguments only take float32 ndarrays, so the exported
+# names convert any array-like first, as the pybind11 bindings did (no-op
+# for float32 arrays)
+def rhythm_multifeature(x, sample_rate, min_tempo=40, max_tempo=208):
+    """Raw BeatTrackerMultiFeature binding; ``x`` may be any array-like."""
+    import numpy as np
+
+    x = np.asarray(x, dtype=np.float32)
+    return _rhythm_multifeature(x, sample_rate, min_tempo, max_tempo)
+
+
+def rhythm_extractor_2013(
+    x, sample_rate, min_tempo=40, max_tempo=208, method="multifeature"
+):
+    """Raw RhythmExtractor2013 binding; ``x`` may be any array-like."""
+    import numpy as np
+
+    x = np.asarray(x, dtype=np.float32)
+    return _rhythm_extractor_2013(x, sample_rate, min_tempo, max_tempo, method)
+
+
+def onset_detection(x, sample_rate):
+    """Raw OnsetRate binding; ``x`` may be any array-like."""
+    import numpy as np
+
+    x = np.asarray(x, dtype=np.float32)
+    return _onset_detection(x, sample_rate)
+
+
 def run_multifeature(x, sr, *, min_tempo=40, max_tempo=208):
     """
     RhythmMultiFeature analysis based on Essentia's BeatTrackerMultiFeature algorithm.
     extracted from Essentia C++ library.
     Args:
-        x: mono float32 numpy array
+        x: mono audio, float32 numpy array (other array-likes are converted)
         sr: sample rate (must be 44100.0)
     Returns:
         dict with keys: bpm, confidence, ticks, bpm_estimates, bpm_intervals
@@ -32,7 +59,7 @@ def run_rhythm_extractor_2013(
     based on Essentia's RhythmExtractor2013 algorithm.
 
     Args:
-        x: mono float32 numpy array
+        x: mono audio, float32 numpy array (other array-likes are converted)
         sr: sample rate (must be 44100.0)
         min_tempo: minimum tempo in BPM (default: 40)
         max_tempo: maximum tempo in BPM (default: 208)
@@ -48,7 +75,7 @@ def run_onset_detection(x, sr):
     Onset detection analysis using Essentia's OnsetRate algorithm.
 
     Args:
-        x: mono float32 numpy array
+        x: mono audio, float32 numpy array (other array-likes are converted)
         sr: sample rate (must be 44100.0)
     Returns:
         dict with keys: onset_rate, onsets
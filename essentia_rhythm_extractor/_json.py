@@ -0,0 +1,31 @@
+"""JSON serialization for analysis results, using orjson when available."""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    # NumPy values neither encoder handles natively: every array/scalar for the
+    # stdlib encoder, non-contiguous or unsupported-dtype arrays for orjson
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj, indent: bool = True) -> str:
+    """Serialize ``obj`` (which may contain NumPy arrays) to a JSON string.
+
+    Uses orjson, which serializes NumPy arrays natively, if installed and falls
+    back to the stdlib encoder otherwise. ``indent`` pretty-prints with two
+    spaces; pass ``indent=False`` for compact single-line output.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, default=_default)
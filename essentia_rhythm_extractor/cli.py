@@ -4,16 +4,62 @@ Thin CLI wrapper for Essentia Rhythm Extractor
 """
 
 import argparse
-import json
+import functools
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import essentia_rhythm_extractor
+from essentia_rhythm_extractor._json import dumps
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".mp3", ".ogg", ".aif", ".aiff", ".m4a"}
+
+
+def _find_audio_files(directory):
+    """Return the audio files directly inside ``directory``, sorted by name."""
+    return sorted(
+        str(path)
+        for path in Path(directory).iterdir()
+        if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS
+    )
+
+
+def _analyze(audio_file, algorithm, min_tempo, max_tempo):
+    """Run the selected algorithm on one file and return its result dict."""
+    # Use file-based functions to avoid Python audio loading overhead
+    if algorithm == "multifeature":
+        result = essentia_rhythm_extractor.run_multifeature_from_file(
+            audio_file, min_tempo=min_tempo, max_tempo=max_tempo
+        )
+    elif algorithm == "onset":
+        result = essentia_rhythm_extractor.run_onset_detection_from_file(audio_file)
+    else:
+        result = essentia_rhythm_extractor.run_rhythm_extractor_2013_from_file(
+            audio_file, min_tempo=min_tempo, max_tempo=max_tempo
+        )
+    return result
+
+
+def _analyze_or_error(audio_file, **kwargs):
+    """Like ``_analyze``, but report a failure as ``{"error": ...}``."""
+    try:
+        return _analyze(audio_file, **kwargs)
+    except Exception as e:
+        return {"error": str(e)}
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Extract rhythm features from audio")
-    parser.add_argument("audio_file", help="Path to audio file")
+    parser = argparse.ArgumentParser(
+        description="Extract rhythm features from audio",
+        epilog="With several files, one that fails to analyze is reported as "
+        '{"file": ..., "error": ...} and the exit status is 1.',
+    )
+    parser.add_argument("audio_file", nargs="*", help="Path(s) to audio file(s)")
+    parser.add_argument(
+        "--batch",
+        metavar="DIR",
+        help="Analyze every audio file in DIR (output is JSON Lines)",
+    )
     parser.add_argument(
         "--algorithm",
         choices=["multifeature", "rhythm2013", "onset"],
@@ -24,42 +70,68 @@ def main():
     parser.add_argument(
         "--max-tempo", type=int, default=208, help="Maximum tempo (BPM)"
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Worker processes when analyzing several files (default: 1)",
+    )
     parser.add_argument("--output", "-o", help="Output JSON file (default: stdout)")
 
     args = parser.parse_args()
 
+    audio_files = list(args.audio_file)
+    if args.batch:
+        if not Path(args.batch).is_dir():
+            print(f"Error: Directory {args.batch} not found", file=sys.stderr)
+            return 1
+        audio_files.extend(_find_audio_files(args.batch))
+    if not audio_files:
+        parser.error("no audio files given")
+
     print(f"Using algorithm: {args.algorithm}", file=sys.stderr)
 
-    if not Path(args.audio_file).exists():
-        print(f"Error: File {args.audio_file} not found", file=sys.stderr)
-        return 1
+    for audio_file in audio_files:
+        if not Path(audio_file).exists():
+            print(f"Error: File {audio_file} not found", file=sys.stderr)
+            return 1
 
-    # Use file-based functions to avoid Python audio loading overhead
-    if args.algorithm == "multifeature":
-        result = essentia_rhythm_extractor.run_multifeature_from_file(
-            args.audio_file, min_tempo=args.min_tempo, max_tempo=args.max_tempo
-        )
-    elif args.algorithm == "onset":
-        result = essentia_rhythm_extractor.run_onset_detection_from_file(
-            args.audio_file
-        )
-    else:
-        result = essentia_rhythm_extractor.run_rhythm_extractor_2013_from_file(
-            args.audio_file, min_tempo=args.min_tempo, max_tempo=args.max_tempo
-        )
+    options = dict(
+        algorithm=args.algorithm, min_tempo=args.min_tempo, max_tempo=args.max_tempo
+    )
 
-    # Convert arrays to lists for JSON serialization
-    for key, value in result.items():
-        if hasattr(value, "tolist"):
-            result[key] = value.tolist()
+    # Single file: keep the plain pretty-printed JSON output
+    if len(audio_files) == 1 and not args.batch:
+        result = _analyze(audio_files[0], **options)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(dumps(result))
+        else:
+            print(dumps(result))
+        return 0
 
-    if args.output:
-        with open(args.output, "w") as f:
-            json.dump(result, f, indent=2)
-    else:
-        print(json.dumps(result, indent=2))
+    # Several files: analyze them in one process (or a worker pool) and emit
+    # one JSON object per line, tagged with its source file, as results come
+    # in. A failing file gets an error line instead of aborting the batch
+    analyze = functools.partial(_analyze_or_error, **options)
+    out = open(args.output, "w") if args.output else sys.stdout
+    executor = ProcessPoolExecutor(max_workers=args.jobs) if args.jobs > 1 else None
+    failed = False
+    try:
+        results = (executor.map if executor else map)(analyze, audio_files)
+        for audio_file, result in zip(audio_files, results):
+            if "error" in result:
+                failed = True
+                print(f"Error: {audio_file}: {result['error']}", file=sys.stderr)
+            print(dumps({"file": audio_file, **result}, indent=False), file=out)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if out is not sys.stdout:
+            out.close()
 
-    return 0
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
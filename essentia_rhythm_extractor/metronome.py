@@ -1,23 +1,23 @@
 """Metronome generation from audio files using rhythm extraction."""
 
-import json
+import functools
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Optional, Tuple
 
+from ._json import dumps
 
-def _quantize_onsets_to_beat_grid(onsets, beats) -> List[float]:
-    """Quantize onset times to the nearest beat grid positions."""
-    import numpy as np
 
-    # Handle case where onsets/beats might be numpy arrays
-    if hasattr(onsets, "any"):
-        if not onsets.any() or len(beats) < 2:
-            return []
-    else:
-        if not len(onsets) or len(beats) < 2:
-            return []
+def _quantize_onsets_to_beat_grid(onsets, beats) -> "np.ndarray":
+    """Quantize onset times to the nearest beat grid positions.
+
+    Returns a sorted array of unique grid times.
+    """
+    import numpy as np
 
-    quantized_onsets = []
+    onsets = np.asarray(onsets, dtype=np.float64)
+    beats = np.asarray(beats, dtype=np.float64)
+    if not len(onsets) or len(beats) < 2:
+        return np.empty(0, dtype=np.float64)
 
     # Calculate beat interval from first few beats for regular grid
     beat_intervals = np.diff(beats[: min(4, len(beats))])
@@ -27,61 +27,136 @@ def _quantize_onsets_to_beat_grid(onsets, beats) -> List[float]:
     first_beat = beats[0]
     last_beat = beats[-1]
 
-    # Extend grid backwards
-    grid_times = []
-    t = first_beat
-    while t > 0:
-        t -= avg_beat_interval
-        grid_times.append(t)
-    grid_times.reverse()
-
-    # Add actual beats
-    grid_times.extend(beats)
-
-    # Extend grid forwards
-    t = last_beat
-    # Handle numpy array check for onsets
-    if hasattr(onsets, "any"):
-        audio_duration = (
-            max(onsets[-1] if onsets.any() else 0, last_beat) + avg_beat_interval
-        )
-    else:
-        audio_duration = (
-            max(onsets[-1] if len(onsets) > 0 else 0, last_beat) + avg_beat_interval
-        )
-    while t < audio_duration:
-        t += avg_beat_interval
-        grid_times.append(t)
+    # Extend grid backwards until it reaches the start of the audio
+    n_back = max(int(np.ceil(first_beat / avg_beat_interval)), 0)
+    back = first_beat - avg_beat_interval * np.arange(n_back, 0, -1)
 
-    grid_times = np.array(sorted(grid_times))
+    # Extend grid forwards past the last onset
+    audio_duration = max(onsets[-1], last_beat) + avg_beat_interval
+    n_fwd = int(np.ceil((audio_duration - last_beat) / avg_beat_interval))
+    fwd = last_beat + avg_beat_interval * np.arange(1, n_fwd + 1)
 
-    # Quantize each onset to nearest grid point
-    for onset_time in onsets:
-        distances = np.abs(grid_times - onset_time)
-        nearest_idx = np.argmin(distances)
-        nearest_beat_time = grid_times[nearest_idx]
+    # All three segments are already sorted, so no sort is needed
+    grid_times = np.concatenate([back, beats, fwd])
 
-        # Only quantize if onset is within reasonable distance (quarter beat)
-        if distances[nearest_idx] < avg_beat_interval * 0.25:
-            quantized_onsets.append(nearest_beat_time)
+    # Find the nearest grid point for every onset at once: the grid is sorted,
+    # so the nearest point is one of the two neighbours of the insertion index
+    idx = np.searchsorted(grid_times, onsets)
+    idx_left = np.clip(idx - 1, 0, len(grid_times) - 1)
+    idx_right = np.clip(idx, 0, len(grid_times) - 1)
+    d_left = np.abs(onsets - grid_times[idx_left])
+    d_right = np.abs(grid_times[idx_right] - onsets)
+    nearest_idx = np.where(d_left <= d_right, idx_left, idx_right)
+    distances = np.minimum(d_left, d_right)
 
-    # Remove duplicates and sort
-    quantized_onsets = sorted(set(quantized_onsets))
+    # Only quantize if onset is within reasonable distance (quarter beat)
+    mask = distances < avg_beat_interval * 0.25
 
-    return quantized_onsets
+    # Remove duplicates and sort in one C-level pass
+    return np.unique(grid_times[nearest_idx][mask])
 
 
+@functools.lru_cache(maxsize=16)
 def _generate_click_sound(
     sample_rate: int = 44100, duration: float = 0.05, frequency: int = 1000
 ) -> "np.ndarray":
-    """Generate a click/beep sound."""
+    """Generate a click/beep sound.
+
+    Results are cached per parameter set, so the returned array is read-only.
+    """
     import numpy as np
 
-    t = np.linspace(0, duration, int(sample_rate * duration))
+    # Work in float32 throughout so there is no float64 -> float32 downcast
+    t = np.linspace(0, duration, int(sample_rate * duration), dtype=np.float32)
     # Create a sine wave with an exponential decay envelope
-    envelope = np.exp(-35 * t)
-    click = np.sin(2 * np.pi * frequency * t) * envelope
-    return click.astype(np.float32)
+    click = np.multiply(t, 2 * np.pi * frequency)
+    np.sin(click, out=click)
+    envelope = np.multiply(t, -35.0, out=t)  # t is not needed after this
+    np.exp(envelope, out=envelope)
+    click *= envelope
+    click.flags.writeable = False
+    return click
+
+
+def _to_sample_indices(times, sample_rate: int) -> "np.ndarray":
+    """Convert times in seconds to non-negative int64 sample indices."""
+    import numpy as np
+
+    starts = (np.asarray(times, dtype=np.float64) * sample_rate).astype(np.int64)
+    # Drop clicks before start of audio (negative time)
+    return starts[starts >= 0]
+
+
+def _downmix(block: "np.ndarray") -> "np.ndarray":
+    """Average a ``(frames, channels)`` block down to a mono float32 array."""
+    import numpy as np
+
+    if block.shape[1] == 1:
+        return block[:, 0]
+    if block.shape[1] == 2:
+        # One add + one in-place scale instead of a general-axis reduction
+        mono = np.add(block[:, 0], block[:, 1], dtype=np.float32)
+        mono *= 0.5
+        return mono
+    return block.mean(axis=1, dtype=np.float32)
+
+
+def _load_mono_audio(
+    input_file: str,
+    target_sr: int = 44100,
+    blocksize: int = 1 << 16,
+    resample_quality: str = "HQ",
+) -> Tuple["np.ndarray", int]:
+    """Decode an audio file to mono float32 at ``target_sr``.
+
+    The file is read block by block and each block is downmixed and resampled
+    as it arrives, so the full multichannel decode is never held in memory.
+    ``resample_quality`` is a soxr quality preset ("QQ", "LQ", "MQ", "HQ", "VHQ").
+    """
+    import numpy as np
+    import soundfile as sf
+
+    with sf.SoundFile(input_file) as f:
+        sample_rate = f.samplerate
+        expected = f.frames
+        resampler = None
+        if sample_rate != target_sr:
+            import soxr
+
+            # A stream is stateful, so each call gets its own (building one is cheap)
+            resampler = soxr.ResampleStream(
+                sample_rate, target_sr, 1, dtype="float32", quality=resample_quality
+            )
+            expected = int(np.ceil(f.frames * target_sr / sample_rate))
+
+        def chunks():
+            for block in f.blocks(blocksize=blocksize, dtype="float32", always_2d=True):
+                # Convert to mono if stereo
+                mono = _downmix(block)
+                yield mono if resampler is None else resampler.resample_chunk(mono)
+            if resampler is not None:
+                yield resampler.resample_chunk(np.zeros(0, np.float32), last=True)
+
+        audio = np.empty(expected, dtype=np.float32)
+        pos = 0
+        for chunk in chunks():
+            end = pos + len(chunk)
+            if end > len(audio):
+                # Frame count in the header was an underestimate
+                audio = np.concatenate([audio[:pos], np.empty(end - pos, np.float32)])
+            audio[pos:end] = chunk
+            pos = end
+
+    return audio[:pos], target_sr
+
+
+def _stamp_clicks(out, starts, click):
+    """Add ``click`` into ``out`` at each sample index in ``starts``."""
+    n = out.shape[0]
+    for start in starts:
+        end = min(start + click.shape[0], n)
+        if end > start:
+            out[start:end] += click[: end - start]
 
 
 def generate_metronome_from_file(
@@ -90,15 +165,19 @@ def generate_metronome_from_file(
     output_file: Optional[str] = None,
     create_mixed: bool = True,
     save_json: bool = True,
+    resample_quality: str = "HQ",
 ) -> Dict:
     """Generate a metronome track from audio file using rhythm extraction.
 
     Args:
         input_file: Path to input audio file
         output_dir: Directory to save output files (required)
-        output_file: Filename for metronome WAV file (defaults to input_file stem + '_metronome.wav')
+        output_file: Filename for metronome audio file, format taken from the
+            extension (defaults to input_file stem + '_metronome.wav')
         create_mixed: Whether to create a mixed version with original audio (default: True)
         save_json: Whether to save beat grid data to JSON (default: True)
+        resample_quality: soxr quality preset used when the input is not 44.1kHz
+            ("QQ", "LQ", "MQ", "HQ", "VHQ"; default: "HQ")
 
     Returns:
         Dict containing:
@@ -106,7 +185,7 @@ def generate_metronome_from_file(
         - beats: List of beat times in seconds
         - confidence: Beat detection confidence
         - onsets: Dict with onset detection results
-        - quantized_onsets: List of quantized onset times
+        - quantized_onsets: Array of quantized onset times
         - metronome_file: Path to generated metronome file
         - mixed_file: Path to mixed file (if create_mixed=True)
         - json_file: Path to JSON file (if save_json=True)
@@ -115,7 +194,7 @@ def generate_metronome_from_file(
     import soundfile as sf
 
     # Import the C++ functions
-    from . import run_onset_detection_from_file, run_rhythm_extractor_2013_from_file
+    from . import run_onset_detection, run_rhythm_extractor_2013
 
     input_path = Path(input_file)
     if not input_path.exists():
@@ -131,19 +210,33 @@ def generate_metronome_from_file(
 
     output_file_path = output_dir_path / output_file
 
-    # Run rhythm analysis using from_file methods
+    # 32-bit float where the container supports it (WAV, AIFF, ...), so
+    # libsndfile stores the buffer as-is; otherwise (e.g. FLAC) the format's
+    # default subtype
+    subtype = (
+        "FLOAT"
+        if sf.check_format(output_file_path.suffix[1:].upper(), "FLOAT")
+        else None
+    )
+
+    # Decode once (streamed to mono float32 at 44100 Hz) and share the buffer
+    # between both analyses and the output tracks
+    audio, sample_rate = _load_mono_audio(
+        str(input_file), resample_quality=resample_quality
+    )
+
+    # Run rhythm analysis on the decoded buffer
     print("Detecting onsets...")
-    onsets = run_onset_detection_from_file(str(input_file))
-    onset_times = onsets.get("onsets", [])
+    onsets = run_onset_detection(audio, sample_rate)
+    # Contiguous float64 arrays up front; everything downstream is bulk NumPy
+    onset_times = np.ascontiguousarray(onsets.get("onsets", []), dtype=np.float64)
     print(f"Found {len(onset_times)} onsets")
 
     print("Extracting rhythm...")
-    rhythm_result = run_rhythm_extractor_2013_from_file(
-        str(input_file), method="multifeature"
-    )
+    rhythm_result = run_rhythm_extractor_2013(audio, sample_rate, method="multifeature")
 
     bpm = rhythm_result["bpm"]
-    beats = rhythm_result["ticks"]
+    beats = np.ascontiguousarray(rhythm_result["ticks"], dtype=np.float64)
     beats_confidence = rhythm_result["confidence"]
     beats_intervals = rhythm_result["bpm_estimates"]
     bpm_intervals = rhythm_result["bpm_intervals"]
@@ -152,24 +245,6 @@ def generate_metronome_from_file(
     print(f"Confidence: {beats_confidence:.2f}")
     print(f"Found {len(beats)} beats")
 
-    # Load audio for metronome generation (we still need this for creating the output)
-    audio, sample_rate = sf.read(input_file, always_2d=False)
-
-    # Convert to mono if stereo
-    if audio.ndim > 1:
-        audio = np.mean(audio, axis=1)
-
-    # Resample to 44100 Hz if necessary
-    target_sr = 44100
-    if sample_rate != target_sr:
-        import soxr
-
-        audio = soxr.resample(audio, sample_rate, target_sr)
-        sample_rate = target_sr
-
-    # Ensure float32
-    audio = audio.astype(np.float32)
-
     # Quantize onsets to beat grid
     print("Quantizing onsets to beat grid...")
     quantized_onsets = _quantize_onsets_to_beat_grid(onset_times, beats)
@@ -178,8 +253,10 @@ def generate_metronome_from_file(
     # Generate metronome track
     print("Generating metronome track...")
 
-    # Create silent track of same length
-    metronome = np.zeros_like(audio)
+    # Create silent track of same length. np.zeros is backed by calloc, which
+    # gets pre-zeroed pages from the OS, so this skips the memset pass that
+    # np.zeros_like makes (normalization and the write still touch every page).
+    metronome = np.zeros(len(audio), dtype=np.float32)
 
     # Generate click sounds
     strong_click = _generate_click_sound(
@@ -190,49 +267,35 @@ def generate_metronome_from_file(
     )  # Quantized onsets
 
     # Place strong clicks at main beat positions
-    for beat_time in beats:
-        sample_idx = int(beat_time * sample_rate)
-        # Skip if beat is before start of audio (negative time)
-        if sample_idx < 0:
-            continue
-        end_idx = min(sample_idx + len(strong_click), len(metronome))
-        click_len = end_idx - sample_idx
-        if click_len > 0:
-            metronome[sample_idx:end_idx] += strong_click[:click_len]
+    beat_starts = _to_sample_indices(beats, sample_rate)
+    _stamp_clicks(metronome, beat_starts, strong_click)
 
     # Place weaker clicks at quantized onset positions (avoid overlapping with main beats)
-    for onset_time in quantized_onsets:
-        # Check if this onset is too close to a main beat
-        # Handle numpy array check for beats
-        if hasattr(beats, "any"):
-            min_distance = (
-                min(abs(onset_time - beat) for beat in beats)
-                if beats.any()
-                else float("inf")
-            )
-        else:
-            min_distance = (
-                min(abs(onset_time - beat) for beat in beats)
-                if len(beats) > 0
-                else float("inf")
-            )
-        if min_distance > 0.05:  # More than 50ms away from nearest beat
-            sample_idx = int(onset_time * sample_rate)
-            # Skip if onset is before start of audio (negative time)
-            if sample_idx < 0:
-                continue
-            end_idx = min(sample_idx + len(weak_click), len(metronome))
-            click_len = end_idx - sample_idx
-            if click_len > 0:
-                metronome[sample_idx:end_idx] += weak_click[:click_len]
+    onset_clicks = quantized_onsets
+    if len(beats) > 0:
+        # Distance from each onset to its nearest beat; beats are sorted, so the
+        # nearest beat is one of the two neighbours of the insertion index
+        idx = np.searchsorted(beats, onset_clicks)
+        left = beats[np.clip(idx - 1, 0, len(beats) - 1)]
+        right = beats[np.clip(idx, 0, len(beats) - 1)]
+        min_distance = np.minimum(
+            np.abs(onset_clicks - left), np.abs(right - onset_clicks)
+        )
+        # Keep onsets more than 50ms away from nearest beat
+        onset_clicks = onset_clicks[min_distance > 0.05]
+
+    onset_starts = _to_sample_indices(onset_clicks, sample_rate)
+    _stamp_clicks(metronome, onset_starts, weak_click)
 
     # Normalize to prevent clipping
-    max_val = np.abs(metronome).max()
+    # Peak magnitude from two reductions, without an abs() copy of the track
+    max_val = max(metronome.max(), -metronome.min())
+    metronome_gain = 0.8 / max_val if max_val > 0 else 1.0
     if max_val > 0:
-        metronome = metronome / max_val * 0.8
+        metronome *= metronome_gain
 
     # Write metronome output
-    sf.write(str(output_file_path), metronome, sample_rate)
+    sf.write(str(output_file_path), metronome, sample_rate, subtype=subtype)
     print(f"Metronome track written to: {output_file_path}")
 
     result = {
@@ -248,38 +311,51 @@ def generate_metronome_from_file(
 
     # Create mixed version if requested
     if create_mixed:
-        mixed_filename = output_file.replace(".wav", "_mixed.wav")
-        mixed_file_path = output_dir_path / mixed_filename
-        mixed = audio * 0.3 + metronome * 0.7  # Mix original (quieter) with metronome
-        max_val = np.abs(mixed).max()
+        mixed_file_path = output_file_path.with_name(
+            f"{output_file_path.stem}_mixed{output_file_path.suffix}"
+        )
+        # Mix original (quieter) with metronome by stamping the scaled clicks
+        # straight into the (no longer needed) audio buffer, rather than
+        # adding the full-length metronome track to it
+        mixed = audio
+        mixed *= 0.3
+        click_gain = 0.7 * metronome_gain
+        _stamp_clicks(mixed, beat_starts, strong_click * click_gain)
+        _stamp_clicks(mixed, onset_starts, weak_click * click_gain)
+        max_val = max(mixed.max(), -mixed.min())
         if max_val > 0:
-            mixed = mixed / max_val * 0.8
-        sf.write(str(mixed_file_path), mixed, sample_rate)
+            mixed *= 0.8 / max_val
+        sf.write(str(mixed_file_path), mixed, sample_rate, subtype=subtype)
         print(f"Mixed track written to: {mixed_file_path}")
         result["mixed_file"] = str(mixed_file_path)
 
     # Save JSON data if requested
     if save_json:
-        json_filename = output_file.replace(".wav", "_beat_grid.json")
-        json_file_path = output_dir_path / json_filename
+        json_file_path = output_file_path.with_name(
+            f"{output_file_path.stem}_beat_grid.json"
+        )
         beat_grid_data = {
             "bpm": float(bpm),
-            "beats": [float(t) for t in beats],
+            "beats": beats,
             "confidence": float(beats_confidence),
-            "onsets": [float(t) for t in onset_times],
-            "quantized_onsets": [float(t) for t in quantized_onsets],
-            "beats_intervals": [float(x) for x in beats_intervals]
-            if beats_intervals is not None
-            else None,
-            "bpm_intervals": [float(x) for x in bpm_intervals]
-            if bpm_intervals is not None
-            else None,
+            "onsets": onset_times,
+            "quantized_onsets": quantized_onsets,
+            "beats_intervals": (
+                np.asarray(beats_intervals, dtype=np.float64)
+                if beats_intervals is not None
+                else None
+            ),
+            "bpm_intervals": (
+                np.asarray(bpm_intervals, dtype=np.float64)
+                if bpm_intervals is not None
+                else None
+            ),
             "sample_rate": int(sample_rate),
             "audio_duration": float(len(audio) / sample_rate),
         }
 
         with open(json_file_path, "w") as f:
-            json.dump(beat_grid_data, f, indent=2)
+            f.write(dumps(beat_grid_data))
         print(f"Beat grid data written to: {json_file_path}")
         result["json_file"] = str(json_file_path)
 
@@ -1,141 +1,150 @@
-#include <pybind11/pybind11.h>
-#include <pybind11/numpy.h>
-// ignore unused variable warning from numpy headers
-#include <numpy/ndarrayobject.h>
+#include <nanobind/nanobind.h>
+#include <nanobind/ndarray.h>
+#include <nanobind/stl/string.h>
 #include "core/mf_runner.h"
 
-namespace py = pybind11;
+namespace nb = nanobind;
 
-static inline void check_input(const py::array &x, double sr)
+// Mono float32 input; nanobind converts other dtypes / strides on the way in
+using AudioIn = nb::ndarray<const float, nb::c_contig, nb::device::cpu>;
+using ArrayOut = nb::ndarray<nb::numpy, double, nb::ndim<1>>;
+
+static inline void check_input(const AudioIn &x, double sr)
 {
     if (x.ndim() != 1)
     {
         throw std::runtime_error("Expected mono 1D array, got " + std::to_string(x.ndim()) + "D array");
     }
 
-    PyArrayObject *array = (PyArrayObject *)x.ptr();
-    if (array->descr->type_num != NPY_FLOAT)
-    {
-        throw std::runtime_error("Expected float32 numpy array, got type_num=" + std::to_string(array->descr->type_num) + " (expected " + std::to_string(NPY_FLOAT) + ")");
-    }
-
     if (sr != 44100.0)
     {
         throw std::runtime_error("Expected sample_rate=44100.0, got " + std::to_string(sr));
     }
 }
 
-py::dict rhythm_multifeature(py::array_t<float> x, double sample_rate,
-                             int min_tempo = 40, int max_tempo = 208)
+// Hand a result vector over to NumPy without copying: the vector is moved
+// to the heap and freed by a capsule when the array is garbage collected.
+static ArrayOut to_numpy(std::vector<double> &&v)
 {
-    check_input(x, sample_rate);
-    auto buf = x.request();
-    auto *data = static_cast<float *>(buf.ptr);
-    auto out = run_multifeature(data, static_cast<size_t>(buf.size),
-                                min_tempo, max_tempo);
+    auto *owner = new std::vector<double>(std::move(v));
+    nb::capsule free_when_done(owner, [](void *p) noexcept
+                               { delete static_cast<std::vector<double> *>(p); });
+    return ArrayOut(owner->data(), {owner->size()}, free_when_done);
+}
 
-    py::dict d;
+static nb::dict to_dict(MFOut &&out)
+{
+    nb::dict d;
     d["bpm"] = out.bpm;
     d["confidence"] = out.confidence;
-    d["ticks"] = py::array(out.ticks_sec.size(), out.ticks_sec.data());
-    d["bpm_estimates"] = py::array(out.bpm_estimates.size(), out.bpm_estimates.data());
-    d["bpm_intervals"] = py::array(out.bpm_intervals_sec.size(), out.bpm_intervals_sec.data());
+    d["ticks"] = to_numpy(std::move(out.ticks_sec));
+    d["bpm_estimates"] = to_numpy(std::move(out.bpm_estimates));
+    d["bpm_intervals"] = to_numpy(std::move(out.bpm_intervals_sec));
+    return d;
+}
+
+static nb::dict to_dict(OnsetOut &&out)
+{
+    nb::dict d;
+    d["onset_rate"] = out.onset_rate;
+    d["onsets"] = to_numpy(std::move(out.onsets_sec));
     return d;
 }
 
-py::dict rhythm_extractor_2013(py::array_t<float> x, double sample_rate,
+// The run_* calls below are pure C++ and can take seconds, so each binding
+// releases the GIL around them and only re-acquires it to build the result.
+nb::dict rhythm_multifeature(AudioIn x, double sample_rate,
+                             int min_tempo = 40, int max_tempo = 208)
+{
+    check_input(x, sample_rate);
+    MFOut out;
+    {
+        nb::gil_scoped_release release;
+        out = run_multifeature(x.data(), x.size(), min_tempo, max_tempo);
+    }
+    return to_dict(std::move(out));
+}
+
+nb::dict rhythm_extractor_2013(AudioIn x, double sample_rate,
                                int min_tempo = 40, int max_tempo = 208,
                                const std::string &method = "multifeature")
 {
     check_input(x, sample_rate);
-    auto buf = x.request();
-    auto *data = static_cast<float *>(buf.ptr);
-    auto out = run_rhythm_extractor_2013(data, static_cast<size_t>(buf.size),
-                                         min_tempo, max_tempo, method);
-
-    py::dict d;
-    d["bpm"] = out.bpm;
-    d["confidence"] = out.confidence;
-    d["ticks"] = py::array(out.ticks_sec.size(), out.ticks_sec.data());
-    d["bpm_estimates"] = py::array(out.bpm_estimates.size(), out.bpm_estimates.data());
-    d["bpm_intervals"] = py::array(out.bpm_intervals_sec.size(), out.bpm_intervals_sec.data());
-    return d;
+    MFOut out;
+    {
+        nb::gil_scoped_release release;
+        out = run_rhythm_extractor_2013(x.data(), x.size(),
+                                        min_tempo, max_tempo, method);
+    }
+    return to_dict(std::move(out));
 }
 
-py::dict onset_detection(py::array_t<float> x, double sample_rate)
+nb::dict onset_detection(AudioIn x, double sample_rate)
 {
     check_input(x, sample_rate);
-    auto buf = x.request();
-    auto *data = static_cast<float *>(buf.ptr);
-    auto out = run_onset_detection(data, static_cast<size_t>(buf.size));
-
-    py::dict d;
-    d["onset_rate"] = out.onset_rate;
-    d["onsets"] = py::array(out.onsets_sec.size(), out.onsets_sec.data());
-    return d;
+    OnsetOut out;
+    {
+        nb::gil_scoped_release release;
+        out = run_onset_detection(x.data(), x.size());
+    }
+    return to_dict(std::move(out));
 }
 
 // File-based Python bindings
-py::dict rhythm_multifeature_from_file(const std::string& filename,
+nb::dict rhythm_multifeature_from_file(const std::string& filename,
                                        int min_tempo = 40, int max_tempo = 208)
 {
-    auto out = run_multifeature_from_file(filename, min_tempo, max_tempo);
-
-    py::dict d;
-    d["bpm"] = out.bpm;
-    d["confidence"] = out.confidence;
-    d["ticks"] = py::array(out.ticks_sec.size(), out.ticks_sec.data());
-    d["bpm_estimates"] = py::array(out.bpm_estimates.size(), out.bpm_estimates.data());
-    d["bpm_intervals"] = py::array(out.bpm_intervals_sec.size(), out.bpm_intervals_sec.data());
-    return d;
+    MFOut out;
+    {
+        nb::gil_scoped_release release;
+        out = run_multifeature_from_file(filename, min_tempo, max_tempo);
+    }
+    return to_dict(std::move(out));
 }
 
-py::dict rhythm_extractor_2013_from_file(const std::string& filename,
+nb::dict rhythm_extractor_2013_from_file(const std::string& filename,
                                          int min_tempo = 40, int max_tempo = 208,
                                          const std::string& method = "multifeature")
 {
-    auto out = run_rhythm_extractor_2013_from_file(filename, min_tempo, max_tempo, method);
-
-    py::dict d;
-    d["bpm"] = out.bpm;
-    d["confidence"] = out.confidence;
-    d["ticks"] = py::array(out.ticks_sec.size(), out.ticks_sec.data());
-    d["bpm_estimates"] = py::array(out.bpm_estimates.size(), out.bpm_estimates.data());
-    d["bpm_intervals"] = py::array(out.bpm_intervals_sec.size(), out.bpm_intervals_sec.data());
-    return d;
+    MFOut out;
+    {
+        nb::gil_scoped_release release;
+        out = run_rhythm_extractor_2013_from_file(filename, min_tempo, max_tempo, method);
+    }
+    return to_dict(std::move(out));
 }
 
-py::dict onset_detection_from_file(const std::string& filename)
+nb::dict onset_detection_from_file(const std::string& filename)
 {
-    auto out = run_onset_detection_from_file(filename);
-
-    py::dict d;
-    d["onset_rate"] = out.onset_rate;
-    d["onsets"] = py::array(out.onsets_sec.size(), out.onsets_sec.data());
-    return d;
+    OnsetOut out;
+    {
+        nb::gil_scoped_release release;
+        out = run_onset_detection_from_file(filename);
+    }
+    return to_dict(std::move(out));
 }
 
-PYBIND11_MODULE(_rhythmext, m)
+NB_MODULE(_rhythmext, m)
 {
     m.doc() = "Essentia RhythmExtractor2013 multifeature (skinny wheel)";
     m.def("rhythm_multifeature", &rhythm_multifeature,
-          py::arg("x"), py::arg("sample_rate"),
-          py::arg("min_tempo") = 40, py::arg("max_tempo") = 208);
+          nb::arg("x"), nb::arg("sample_rate"),
+          nb::arg("min_tempo") = 40, nb::arg("max_tempo") = 208);
     m.def("rhythm_extractor_2013", &rhythm_extractor_2013,
-          py::arg("x"), py::arg("sample_rate"),
-          py::arg("min_tempo") = 40, py::arg("max_tempo") = 208,
-          py::arg("method") = "multifeature");
+          nb::arg("x"), nb::arg("sample_rate"),
+          nb::arg("min_tempo") = 40, nb::arg("max_tempo") = 208,
+          nb::arg("method") = "multifeature");
     m.def("onset_detection", &onset_detection,
-          py::arg("x"), py::arg("sample_rate"));
+          nb::arg("x"), nb::arg("sample_rate"));
 
     // File-based functions
     m.def("rhythm_multifeature_from_file", &rhythm_multifeature_from_file,
-          py::arg("filename"),
-          py::arg("min_tempo") = 40, py::arg("max_tempo") = 208);
+          nb::arg("filename"),
+          nb::arg("min_tempo") = 40, nb::arg("max_tempo") = 208);
     m.def("rhythm_extractor_2013_from_file", &rhythm_extractor_2013_from_file,
-          py::arg("filename"),
-          py::arg("min_tempo") = 40, py::arg("max_tempo") = 208,
-          py::arg("method") = "multifeature");
+          nb::arg("filename"),
+          nb::arg("min_tempo") = 40, nb::arg("max_tempo") = 208,
+          nb::arg("method") = "multifeature");
     m.def("onset_detection_from_file", &onset_detection_from_file,
-          py::arg("filename"));
-}
\ No newline at end of file
+          nb::arg("filename"));
+}
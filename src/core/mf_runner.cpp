@@ -1,4 +1,5 @@
 #include "mf_runner.h"
+#include <mutex>
 #include "vendor/essentia/src/essentia/essentia.h"
 #include "vendor/essentia/src/essentia/algorithmfactory.h"
 #include "vendor/essentia/src/essentia/streaming/algorithms/poolstorage.h"
@@ -11,13 +12,11 @@ using namespace essentia;
 using namespace essentia::streaming;
 using namespace essentia::scheduler;
 
-// Global initialization - only happens once per process
-static bool essentia_initialized = false;
+// Global initialization - only happens once per process. The bindings call
+// in here without the GIL, so guard it against concurrent first calls.
+static std::once_flag essentia_init_flag;
 static void ensure_essentia_initialized() {
-    if (!essentia_initialized) {
-        essentia::init();
-        essentia_initialized = true;
-    }
+    std::call_once(essentia_init_flag, [] { essentia::init(); });
 }
 
 MFOut run_multifeature(const float *mono_44100, size_t n_samples,
@@ -264,11 +263,6 @@ OnsetOut run_onset_detection(const float *mono_44100, size_t n_samples)
         out.onset_rate = onsetRateValue;
         out.onsets_sec = vector<double>(onsets.begin(), onsets.end());
         
-        // Debug output
-        std::cerr << "Debug: signal size=" << signal.size() 
-                  << ", onsetRate=" << onsetRateValue 
-                  << ", onsets count=" << onsets.size() << std::endl;
-        
         // Clean up
         delete onsetRate;
         
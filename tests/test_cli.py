@@ -0,0 +1,183 @@
+"""
+Tests for the rhythm-extractor command line interface.
+"""
+
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import essentia_rhythm_extractor as ere
+from essentia_rhythm_extractor import _json, cli
+
+
+# Helper functions
+
+def fake_multifeature_from_file(filename, min_tempo=40, max_tempo=208):
+    """Stand-in for the C++ analysis, so the CLI can run on empty files."""
+    return {
+        'bpm': 120.0,
+        'confidence': 3.5,
+        'ticks': np.array([0.5, 1.0, 1.5]),
+        'bpm_estimates': np.array([120.0]),
+        'bpm_intervals': np.array([0.5]),
+    }
+
+
+def failing_multifeature_from_file(filename, min_tempo=40, max_tempo=208):
+    """Like ``fake_multifeature_from_file``, but fails on FLAC files."""
+    if filename.endswith('.FLAC'):
+        raise RuntimeError('cannot decode')
+    return fake_multifeature_from_file(filename, min_tempo, max_tempo)
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """Thread pool standing in for ProcessPoolExecutor (workers see monkeypatches)."""
+
+    max_workers = []
+
+    def __init__(self, max_workers=None):
+        RecordingExecutor.max_workers.append(max_workers)
+        super().__init__(max_workers=max_workers)
+
+
+def run_cli(monkeypatch, *args) -> int:
+    """Run ``rhythm-extractor`` with ``args`` and return its exit code."""
+    monkeypatch.setattr(sys, 'argv', ['rhythm-extractor', *args])
+    return cli.main()
+
+
+# Fixtures
+
+@pytest.fixture(autouse=True)
+def fake_analysis(monkeypatch):
+    """Replace the multifeature analysis for every test in this module."""
+    monkeypatch.setattr(ere, 'run_multifeature_from_file', fake_multifeature_from_file)
+
+
+@pytest.fixture
+def audio_dir(tmp_path):
+    """A directory holding two audio files and one non-audio file."""
+    for name in ('b.wav', 'a.FLAC', 'notes.txt'):
+        (tmp_path / name).write_bytes(b'')
+    return tmp_path
+
+
+# Tests
+
+def test_find_audio_files_filters_by_extension(audio_dir):
+    """Only audio extensions (case-insensitive) are picked up, sorted by name."""
+    files = cli._find_audio_files(audio_dir)
+    assert files == [str(audio_dir / 'a.FLAC'), str(audio_dir / 'b.wav')]
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_dumps_accepts_any_numpy_array(monkeypatch, use_orjson):
+    """Both JSON backends accept strided and non-native-dtype arrays alike."""
+    if use_orjson and _json.orjson is None:
+        pytest.skip('orjson not installed')
+    if not use_orjson:
+        monkeypatch.setattr(_json, 'orjson', None)
+
+    data = {'strided': np.arange(6.0)[::2], 'half': np.array([1, 2], dtype=np.float16)}
+    assert json.loads(_json.dumps(data)) == {'strided': [0.0, 2.0, 4.0], 'half': [1.0, 2.0]}
+
+
+def test_single_file_prints_pretty_json(monkeypatch, capsys, audio_dir):
+    """A single file produces one indented JSON object without a ``file`` key."""
+    assert run_cli(monkeypatch, str(audio_dir / 'b.wav')) == 0
+
+    out = capsys.readouterr().out
+    result = json.loads(out)
+    assert out.count('\n') > 1  # pretty-printed
+    assert 'file' not in result
+    assert result['bpm'] == 120.0
+    assert result['ticks'] == [0.5, 1.0, 1.5]
+
+
+def test_multiple_files_print_json_lines(monkeypatch, capsys, audio_dir):
+    """Several files produce one compact JSON object per line, tagged with the file."""
+    files = [str(audio_dir / 'b.wav'), str(audio_dir / 'a.FLAC')]
+    assert run_cli(monkeypatch, *files) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 2
+    results = [json.loads(line) for line in lines]
+    assert [r['file'] for r in results] == files
+    assert all(r['bpm'] == 120.0 for r in results)
+
+
+def test_batch_directory_skips_non_audio(monkeypatch, capsys, audio_dir):
+    """``--batch`` analyzes only the audio files in the directory, as JSON Lines."""
+    assert run_cli(monkeypatch, '--batch', str(audio_dir)) == 0
+
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r['file'] for r in results] == [str(audio_dir / 'a.FLAC'), str(audio_dir / 'b.wav')]
+
+
+def test_batch_output_file(monkeypatch, audio_dir, tmp_path):
+    """``--output`` receives the JSON Lines instead of stdout."""
+    output = tmp_path / 'results.jsonl'
+    assert run_cli(monkeypatch, '--batch', str(audio_dir), '-o', str(output)) == 0
+
+    lines = output.read_text().splitlines()
+    assert len(lines) == 2
+
+
+def test_jobs_use_a_worker_pool(monkeypatch, capsys, audio_dir):
+    """``--jobs`` sizes the worker pool and keeps the output in input order."""
+    monkeypatch.setattr(cli, 'ProcessPoolExecutor', RecordingExecutor)
+    monkeypatch.setattr(RecordingExecutor, 'max_workers', [])
+    assert run_cli(monkeypatch, '--batch', str(audio_dir), '--jobs', '3') == 0
+
+    assert RecordingExecutor.max_workers == [3]
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r['file'] for r in results] == [str(audio_dir / 'a.FLAC'), str(audio_dir / 'b.wav')]
+    assert all(r['bpm'] == 120.0 for r in results)
+
+
+def test_default_jobs_use_no_worker_pool(monkeypatch, audio_dir):
+    """Without ``--jobs`` the files are analyzed in this process."""
+    monkeypatch.setattr(cli, 'ProcessPoolExecutor', RecordingExecutor)
+    monkeypatch.setattr(RecordingExecutor, 'max_workers', [])
+    assert run_cli(monkeypatch, '--batch', str(audio_dir)) == 0
+    assert RecordingExecutor.max_workers == []
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_failing_file_does_not_abort_batch(monkeypatch, capsys, audio_dir, jobs):
+    """A failing file gets an error line, the others keep their results, exit status 1."""
+    monkeypatch.setattr(ere, 'run_multifeature_from_file', failing_multifeature_from_file)
+    monkeypatch.setattr(cli, 'ProcessPoolExecutor', RecordingExecutor)
+    assert run_cli(monkeypatch, '--batch', str(audio_dir), '--jobs', jobs) == 1
+
+    captured = capsys.readouterr()
+    failed, ok = [json.loads(line) for line in captured.out.splitlines()]
+    assert failed == {'file': str(audio_dir / 'a.FLAC'), 'error': 'cannot decode'}
+    assert ok['file'] == str(audio_dir / 'b.wav')
+    assert ok['bpm'] == 120.0
+    assert 'cannot decode' in captured.err
+
+
+def test_batch_missing_directory(monkeypatch, capsys, tmp_path):
+    """A missing ``--batch`` directory is reported and exits with status 1."""
+    missing = tmp_path / 'does-not-exist'
+    assert run_cli(monkeypatch, '--batch', str(missing)) == 1
+    assert f"Directory {missing} not found" in capsys.readouterr().err
+
+
+def test_missing_file(monkeypatch, capsys, tmp_path):
+    """A missing input file is reported and exits with status 1."""
+    missing = tmp_path / 'missing.wav'
+    assert run_cli(monkeypatch, str(missing)) == 1
+    assert f"File {missing} not found" in capsys.readouterr().err
+
+
+def test_no_input_is_a_usage_error(monkeypatch, capsys):
+    """Running without files or ``--batch`` is an argparse usage error."""
+    with pytest.raises(SystemExit) as excinfo:
+        run_cli(monkeypatch)
+    assert excinfo.value.code == 2
+    assert 'no audio files given' in capsys.readouterr().err